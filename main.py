@@ -47,8 +47,9 @@ def prepare_environment(debug: bool, tick_speed: int, no_buffering: bool, tp: bo
     INTERFACE.setBuffering(not no_buffering)
     INTERFACE.placeBlockFlags(doBlockUpdates=True, customFlags='0100011')
 
-    INTERFACE.runCommand(f'gamerule doTileDrops {str(drops).lower()}')
-    INTERFACE.runCommand(f'gamerule randomTickSpeed {tick_speed}')
+    # The interface runs one command per line, a single request is enough
+    INTERFACE.runCommand(f'gamerule doTileDrops {str(drops).lower()}\n'
+                         f'gamerule randomTickSpeed {tick_speed}')
 
     if env.PROFILE_TIME:
         import cProfile
@@ -89,8 +90,8 @@ def start_simulation(years: int) -> None:
 
     INTERFACE.sendBlocks()
 
-    INTERFACE.runCommand('gamerule randomTickSpeed 3')
-    INTERFACE.runCommand('gamerule doEntityDrops true')
+    INTERFACE.runCommand('gamerule randomTickSpeed 3\n'
+                         'gamerule doEntityDrops true')
 
 
 def find_building_materials(build_area: Plot):
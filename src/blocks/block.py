@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import Dict, List, Tuple
 from dataclasses import dataclass, replace, field
 
@@ -34,7 +35,14 @@ class Block:
 
     @staticmethod
     def deserialize(name: str, coordinates: Coordinates) -> Block:
-        """"""
+        """Return a new block at the given [coordinates] from its serialized [name], properties included"""
+        name, properties = Block.__parse_name(name)
+        return Block(name, coordinates, properties=properties)
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def __parse_name(name: str) -> tuple[str, BlockProperties]:
+        """Return the name and properties parsed from the given serialized block [name]"""
         properties = dict()
 
         if '[' in name:
@@ -44,7 +52,7 @@ class Block:
                               for key, value in (element.split('=')
                                                  for element in raw_properties[1][:-1].split(', ')))
 
-        return Block(name, coordinates, properties=BlockProperties(properties))
+        return name, BlockProperties(properties)
 
     @staticmethod
     def trim_name(name: str, pattern: str) -> str:
@@ -84,13 +92,14 @@ class Block:
 
     def is_one_of(self, pattern: str | Tuple[str, ...]) -> bool:
         """Return true if the current item's name matches the given pattern"""
-        if type(pattern) == str:
-            pattern = (pattern, )
+        pattern = (pattern, ) if type(pattern) == str else tuple(pattern)
+        return Block.__name_matches(self.name, pattern)
 
-        for part in pattern:
-            if part in self.name:
-                return True
-        return False
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def __name_matches(name: str, pattern: Tuple[str, ...]) -> bool:
+        """Return true if one of the parts of the given [pattern] is found in the block [name]"""
+        return any(part in name for part in pattern)
 
     def rotate(self, angle: int, rotation_point: Coordinates = Coordinates(0, 0, 0)) -> Block:
         """Rotate the block coordinates and modify its properties to mimic rotation around a given
@@ -3,8 +3,11 @@ from typing import Generator, Iterable, SupportsIndex
 
 import random
 from collections import Counter
+from itertools import compress
 from collections.abc import Sequence
 
+import numpy as np
+
 from src.blocks.block import Block
 from src.blocks.utils.palette import Palette
 from src.blocks.collections.block_set import BlockSet
@@ -18,56 +21,107 @@ class BlockList(Sequence):
     def __init__(self, iterable: Iterable[Block] = None):
         """Parameterised constructor creating a new list of blocks"""
         self.__blocks: list[Block] = list(iterable) if iterable else list()
-        self.__coordinates = {block.coordinates.as_2D(): block for block in self.__blocks}
+        # Keyed by (x, z) tuples
+        self.__coordinates = {(block.coordinates.x, block.coordinates.z): block for block in self.__blocks}
+        self.__names: np.ndarray | None = None
+        self.__name_table: np.ndarray | None = None
+        self.__name_ids: np.ndarray | None = None
+        self.__positions: np.ndarray | None = None
+
+    @property
+    def names(self) -> np.ndarray:
+        """Return the array of the names of the blocks, in the same order as the blocks"""
+        if self.__names is None:
+            self.__names = np.array([block.name for block in self.__blocks], dtype=object)
+        return self.__names
+
+    @property
+    def name_ids(self) -> tuple[np.ndarray, np.ndarray]:
+        """Return the distinct names of the blocks in order of first appearance, along with the
+        index of the name of each block in them"""
+        if self.__name_ids is None:
+            table, first, ids = np.unique(self.names, return_index=True, return_inverse=True)
+            order = np.argsort(first, kind='stable')
+            rank = np.empty_like(order)
+            rank[order] = np.arange(len(order))
+            self.__name_table, self.__name_ids = table[order], rank[ids].reshape(-1)
+        return self.__name_table, self.__name_ids
+
+    @property
+    def positions(self) -> np.ndarray:
+        """Return the (length, 3) array of the x, y and z coordinates of the blocks"""
+        if self.__positions is None:
+            self.__positions = np.array([(block.coordinates.x, block.coordinates.y, block.coordinates.z)
+                                         for block in self.__blocks], dtype=np.int64).reshape(-1, 3)
+        return self.__positions
 
     @property
     def counter(self) -> Counter[str]:
         """Return the counter of the blocks in the given list of blocks"""
-        names = (block.name for block in self)
-        return Counter(names)
+        names, name_ids = self.name_ids
+        counts = np.bincount(name_ids, minlength=len(names))
+        return Counter(dict(zip(names.tolist(), counts.tolist())))
 
     @property
     def most_common(self) -> str | None:
         """Return the name of the most common block in the current list of blocks"""
-        occurences = self.counter.most_common(1)
-        return occurences[0][0] if occurences else None
+        if not self.__blocks:
+            return None
+
+        names, name_ids = self.name_ids
+        # Ties are broken by the first name seen, like Counter.most_common
+        return str(names[np.bincount(name_ids, minlength=len(names)).argmax()])
 
     def insert(self, index: SupportsIndex, block: Block) -> None:
         """Insert the given block before the given index"""
         self.__blocks.insert(index, block)
+        self.__names = None
+        self.__name_ids = None
+        self.__positions = None
 
     def without(self, pattern: str | tuple[str, ...]) -> BlockList:
         """Return a sublist of blocks not containing the given pattern in their name"""
         if type(pattern) == str:
             pattern = (pattern, )
 
-        return BlockList([block for block in self.__blocks if not block.is_one_of(pattern)])
+        return BlockList(compress(self.__blocks, ~self.mask(pattern)))
 
     def filter(self, pattern: str | Iterable[str]) -> BlockList:
         """Return a sublist of blocks containing the given [pattern] in their name"""
         pattern = [pattern] if type(pattern) is str else pattern
-        return BlockList([block for block in self if block.is_one_of(pattern)])
+        return BlockList(compress(self.__blocks, self.mask(pattern)))
 
-    def get_valid_build_block_list(self, pattern: str | tuple[str, ...], coordinates: set[Coordinates]) -> list[Block]:
-        if type(pattern) == str:
-            pattern = (pattern,)
-        iterable = [block for block in self.__blocks if block.coordinates.as_2D() not in coordinates]
-        return [block for block in iterable if not block.is_one_of(pattern)]
+    def mask(self, pattern: str | Iterable[str]) -> np.ndarray:
+        """Return a boolean mask of the blocks whose name contains one of the parts of the given [pattern]"""
+        pattern = (pattern, ) if type(pattern) is str else tuple(pattern)
+        return self.masks(pattern)[0]
+
+    def masks(self, *patterns: str | Iterable[str]) -> np.ndarray:
+        """Return a (len(patterns), length) boolean array whose rows are the masks of the given [patterns]"""
+        patterns = [(pattern, ) if type(pattern) is str else tuple(pattern) for pattern in patterns]
+        names, name_ids = self.name_ids
+        matches = np.array([[any(part in name for part in pattern) for name in names]
+                            for pattern in patterns], dtype=bool).reshape(len(patterns), len(names))
+        return matches[:, name_ids]
 
     def apply_palettes(self, palettes: dict[str, Palette]) -> BlockList:
         """Return a modified version of the current BlockList. Modification are made according
         to the given [palettes] of blocks"""
-        new_blocks = [palettes[block.name].get_block(block) if block.name in palettes else block
-                      for block in self.__blocks]
+        names, name_ids = self.name_ids
+        changed = np.fromiter((name in palettes for name in names), dtype=bool, count=len(names))[name_ids]
+
+        # Only the blocks whose name has a palette are visited, in order for the sequence palettes
+        new_blocks = list(self.__blocks)
+        for index in np.flatnonzero(changed).tolist():
+            block = new_blocks[index]
+            new_blocks[index] = palettes[block.name].get_block(block)
 
         return BlockList(new_blocks)
 
 
     def find(self, coordinates: Coordinates) -> Block | None:
         """Return the block at the given 2D coordinates"""
-        if coordinates.as_2D() in self.__coordinates.keys():
-            return self.__coordinates[coordinates.as_2D()]
-        return None
+        return self.__coordinates.get((coordinates.x, coordinates.z))
 
     # def near(self, coordinates: Coordinates, distance: int):
     #     """Return the list of block with a distance < the given distance"""
@@ -3,6 +3,7 @@ import dataclasses
 
 import random
 import functools
+import itertools
 from abc import ABC, abstractmethod
 from typing import Any
 
@@ -57,8 +58,8 @@ class RandomPalette(Palette):
         self.prefix = palette.get('prefix', '')
 
         if type(self.blocks) == dict:
-            self.population = self.blocks.keys()
-            self.weights = self.blocks.values()
+            self.population = list(self.blocks.keys())
+            self.cum_weights = list(itertools.accumulate(self.blocks.values()))
 
     def get_block(self, old_block: Block) -> Block:
         """Return a randomly selected block from the palette. If the palette 'blocks' attribute
@@ -67,9 +68,7 @@ class RandomPalette(Palette):
         if type(self.blocks) in [list, tuple]:
             block_name = random.choice(self.blocks)
         else:
-            choices = random.choices(
-                list(self.population),
-                list(self.weights), k=1)
+            choices = random.choices(self.population, cum_weights=self.cum_weights, k=1)
             block_name = choices[0]
 
         block_name.replace(':', f':{self.prefix}')
@@ -2,10 +2,12 @@ from __future__ import annotations
 
 import math
 import random
+import re
 from collections import defaultdict
 from datetime import time as datetime
 import time as time
-from functools import lru_cache
+from functools import cached_property, lru_cache
+from itertools import accumulate, compress, product
 from typing import Generator
 
 import networkx as nx
@@ -13,6 +15,7 @@ import numpy as np
 from gdpc import interface as INTF
 from gdpc import lookup
 from numpy import ndarray
+from numpy.lib.stride_tricks import sliding_window_view
 
 from src import env
 from src.blocks.block import Block
@@ -25,6 +28,87 @@ from src.utils.criteria import Criteria
 from src.utils.direction import Direction
 
 
+# Blocks that may stand between the ground and the top of a column (trees, vines, air...)
+ABOVE_GROUND_BLOCKS = ('air', 'leaves', 'log', 'vine', 'bamboo')
+_ABOVE_GROUND_PATTERN = re.compile('|'.join(ABOVE_GROUND_BLOCKS))
+
+# Parts of a road, from the most to the least important, and the offsets of their blocks from the path
+ROAD_PARTS = ('INNER', 'MIDDLE', 'OUTER')
+ROAD_OFFSETS = (('INNER', 0, 0),
+                ('MIDDLE', 1, 0), ('MIDDLE', -1, 0), ('MIDDLE', 0, 1), ('MIDDLE', 0, -1),
+                ('OUTER', 1, 1), ('OUTER', -1, 1), ('OUTER', 1, -1), ('OUTER', -1, -1),
+                ('OUTER', 2, 0), ('OUTER', -2, 0), ('OUTER', 0, 2), ('OUTER', 0, -2))
+# For each part, the parts taking precedence over it and the parts it takes precedence over
+_ROAD_PRECEDENCE = {part: (ROAD_PARTS[:i], ROAD_PARTS[i + 1:]) for i, part in enumerate(ROAD_PARTS)}
+
+
+@lru_cache(maxsize=None)
+def _is_above_ground(name: str) -> bool:
+    """Return true if the block of the given [name] is not part of the ground"""
+    return _ABOVE_GROUND_PATTERN.search(name) is not None
+
+
+def _is_above_ground_at(x: int, y: int, z: int) -> bool:
+    """Return true if the block found at the given x, y, z coordinates in the env.WORLD is not part of the ground"""
+    try:
+        return _is_above_ground(env.WORLD.getBlockAt(x, y, z))
+    except IndexError:
+        return False
+
+
+def _steep_kernel(heightmap: ndarray, span: int, water: ndarray, water_value: float) -> ndarray:
+    """Return the sum of the height differences between each cell of the [heightmap] and the cells
+    at most [span] blocks around it, for every cell that is far enough from the borders. The cells
+    marked in the [water] mask get the [water_value] instead"""
+    height, width = heightmap.shape
+    inner = np.s_[span:height - span, span:width - span]
+    center = heightmap[inner]
+    steep = np.zeros(center.shape, dtype=np.float64)
+    delta = np.empty(center.shape, dtype=heightmap.dtype)
+
+    # Accumulate one shifted view at a time into the final float array, skipping the center
+    for dx in range(2 * span + 1):
+        for dz in range(2 * span + 1):
+            if dx == dz == span:
+                continue
+            np.subtract(heightmap[dx:dx + center.shape[0], dz:dz + center.shape[1]], center, out=delta)
+            np.abs(delta, out=delta)
+            np.add(steep, delta, out=steep)
+
+    np.putmask(steep, water[inner], water_value)
+    return steep
+
+
+def _box_sum(values: ndarray, radius: int) -> ndarray:
+    """Return the sum of the [values] in the square of the given [radius] around each cell, the
+    cells outside the array counting as zeros. Computed with a summed-area table"""
+    side = 2 * radius + 1
+    table = np.zeros((values.shape[0] + side, values.shape[1] + side), dtype=np.int64)
+    table[radius + 1:values.shape[0] + radius + 1, radius + 1:values.shape[1] + radius + 1] = values
+    table = table.cumsum(axis=0).cumsum(axis=1)
+    return table[side:, side:] - table[:-side, side:] - table[side:, :-side] + table[:-side, :-side]
+
+
+def _cumulative_pattern(pattern: dict[str, dict[str, float]]) -> dict[str, tuple[list[str], list[float]]]:
+    """Return the block names of each part of the given road [pattern], with their cumulative weights"""
+    return {key: (list(weights.keys()), list(accumulate(weights.values()))) for key, weights in pattern.items()}
+
+
+def _get_blocks_at(xs: ndarray, ys: ndarray, zs: ndarray) -> list[Block]:
+    """Return the blocks found in the env.WORLD at the coordinates given by the [xs], [ys] and [zs] arrays"""
+    get_block_name = env.WORLD.getBlockAt
+    deserialize = Block.deserialize
+
+    blocks = []
+    append = blocks.append
+    for x, y, z in zip(xs.ravel().tolist(), ys.ravel().tolist(), zs.ravel().tolist()):
+        try:
+            append(deserialize(get_block_name(x, y, z), Coordinates(x, y, z)))
+        except IndexError:
+            append(Block('out of bound', None))
+    return blocks
+
+
 class Plot:
     """Class representing a plot"""
 
@@ -34,8 +118,16 @@ class Plot:
         self.end = Coordinates(x + size.x, 255, z + size.z)
         self.size = size
         self.offset = self.start - env.BUILD_AREA.start, self.end - env.BUILD_AREA.start
+        self.__heightmap_area = (slice(self.offset[0].x, self.offset[1].x),
+                                 slice(self.offset[0].z, self.offset[1].z))
+        self.__bounds = (*self.start, *self.end)
         self.surface_blocks: dict[Criteria, BlockList] = {}
-        self.water_mode = 'water' in self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES).most_common
+        self.__surface_arrays: dict[Criteria, tuple[ndarray, ndarray]] = {}
+
+    @cached_property
+    def water_mode(self) -> bool:
+        """Return true if the surface of the plot is mostly made of water"""
+        return 'water' in self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES).most_common
 
     def remove_lava(self):
         checked = set()
@@ -59,9 +151,12 @@ class Plot:
         return Plot(*start, Size.from_coordinates(start, end))
 
     def update(self) -> None:
-        """Update the env.WORLD slice and most importantly the heightmaps"""
-        env.get_world_slice()
+        """Update the env.WORLD slice and most importantly the heightmaps. The world slice is
+        fetched once and shared by every plot, only the caches derived from it are cleared"""
+        env.WORLD = env.get_world_slice()
+        Plot.get_block_at.cache_clear()
         self.surface_blocks.clear()
+        self.__surface_arrays.clear()
 
     def visualize(self, ground: str = 'orange_wool', criteria: Criteria = Criteria.MOTION_BLOCKING_NO_TREES) -> None:
         """Change the blocks at the surface of the plot to visualize it"""
@@ -81,31 +176,45 @@ class Plot:
 
     def get_heightmap(self, criteria: Criteria) -> ndarray:
         """Return the desired heightmap of the given type"""
+        heightmap = self.__get_world_heightmap(criteria)[self.__heightmap_area]
+        return np.ascontiguousarray(heightmap, dtype=np.int32)
+
+    def __get_world_heightmap(self, criteria: Criteria) -> ndarray:
+        """Return the desired heightmap of the given type, for the whole build area"""
         # Add our custom
-        if Criteria.MOTION_BLOCKING_NO_TREES not in env.WORLD.heightmaps:
+        if Criteria.MOTION_BLOCKING_NO_TREES.name not in env.WORLD.heightmaps:
             env.WORLD.heightmaps[Criteria.MOTION_BLOCKING_NO_TREES.name] = self.__get_heightmap_no_trees()
 
-        if criteria.name in env.WORLD.heightmaps.keys():
-            return env.WORLD.heightmaps[criteria.name][self.offset[0].x:self.offset[1].x,
-                                                       self.offset[0].z:self.offset[1].z]
+        if criteria.name in env.WORLD.heightmaps:
+            return env.WORLD.heightmaps[criteria.name]
 
         raise Exception(f'Invalid criteria: {criteria}')
 
     def get_blocks(self, criteria: Criteria) -> BlockList:
         """Return a list of the blocks at the surface of the plot, using the given criteria"""
 
-        if criteria in self.surface_blocks.keys():
+        if criteria in self.surface_blocks:
             return self.surface_blocks[criteria]
 
-        surface = []
         heightmap = self.get_heightmap(criteria)
 
-        for x, rest in enumerate(heightmap):
-            for z, h in enumerate(rest):
-                coordinates = Coordinates(self.start.x + x, h - 1, self.start.z + z)
-                surface.append(self.get_block_at(*coordinates))
+        xs, zs = np.meshgrid(np.arange(heightmap.shape[0]) + self.start.x,
+                             np.arange(heightmap.shape[1]) + self.start.z, indexing='ij')
+        ys = heightmap - 1
+
+        blocks = np.empty(heightmap.size, dtype=object)
+        missing = np.ones(heightmap.size, dtype=bool)
 
-        self.surface_blocks[criteria] = BlockList(surface)
+        # The columns having the same height as in an already computed surface share its blocks
+        for known_heightmap, known_blocks in self.__surface_arrays.values():
+            reused = missing & (known_heightmap == heightmap).ravel()
+            blocks[reused] = known_blocks[reused]
+            missing &= ~reused
+
+        blocks[missing] = _get_blocks_at(xs.ravel()[missing], ys.ravel()[missing], zs.ravel()[missing])
+
+        self.__surface_arrays[criteria] = (heightmap, blocks)
+        self.surface_blocks[criteria] = BlockList(blocks.tolist())
         return self.surface_blocks[criteria]
 
     def __get_heightmap_no_trees(self) -> np.ndarray:
@@ -115,16 +224,21 @@ class Plot:
         floating' logs, but it is good enough for our use"""
         heightmap = np.copy(env.WORLD.heightmaps[Criteria.MOTION_BLOCKING_NO_LEAVES.name])
 
-        for x, rest in enumerate(heightmap):
-            for z, h in enumerate(rest):
-                base_coord = Coordinates(env.BUILD_AREA.start.x + x, h - 1, env.BUILD_AREA.start.z + z)
+        xs, zs = np.indices(heightmap.shape)
+        xs += env.BUILD_AREA.start.x
+        zs += env.BUILD_AREA.start.z
 
-                ground_coord = None
-                # To get to the last block until the ground
-                for ground_coord in self.__yield_until_ground(base_coord):
-                    pass
-                if ground_coord:
-                    heightmap[x, z] = ground_coord.y
+        # Walk down all the columns at once, one layer at a time. Only the columns whose top
+        # block is still above the ground are checked again on the next layer
+        columns = np.ones(heightmap.shape, dtype=bool)
+        while columns.any():
+            ys = heightmap[columns] - 1
+            above_ground = np.fromiter(
+                (_is_above_ground_at(x, y, z) for x, y, z in zip(xs[columns].tolist(), ys.tolist(), zs[columns].tolist())),
+                dtype=bool, count=ys.size)
+
+            columns[columns] = above_ground
+            heightmap[columns] -= 1
 
         return heightmap
 
@@ -136,30 +250,31 @@ class Plot:
         if surface is None:
             surface = self.get_blocks(Criteria.MOTION_BLOCKING_NO_LEAVES)
 
-        amount = 0
-        unwanted_blocks = surface.filter(pattern).to_set()
-
         if env.DEBUG:
             print(f'\n=> Removing trees on plot at {self.start} with size {self.size}')
 
-        while unwanted_blocks:
-            block = unwanted_blocks.pop()
-            for coord in self.__yield_until_ground(block.coordinates):
-                INTF.placeBlock(*coord, 'minecraft:air')
-                amount += 1
+        # Gather all the blocks to remove first, so that they are sent in one go
+        air_coordinates = {coordinates
+                           for block in surface.filter(pattern).to_set()
+                           for coordinates in self.__yield_until_ground(block.coordinates)}
+
+        for coordinates in air_coordinates:
+            INTF.placeBlock(*coordinates, 'minecraft:air')
 
         INTF.sendBlocks()
         if env.DEBUG:
-            print(f'=> Deleted {amount} blocs\n')
+            print(f'=> Deleted {len(air_coordinates)} blocs\n')
         # self.update()
 
-    def __yield_until_ground(self, coordinates: Coordinates):
-        """Yield the coordinates """
-        current_coord: Coordinates = coordinates
+    def __yield_until_ground(self, coordinates: Coordinates) -> Generator[tuple[int, int, int]]:
+        """Yield the x, y, z tuples of the blocks above the ground, from the given [coordinates] downward. The
+        ground is read from the no-trees heightmap, built by walking down the very same columns"""
+        x, y, z = coordinates
+        heightmap = self.__get_world_heightmap(Criteria.MOTION_BLOCKING_NO_TREES)
+        lowest_y = int(heightmap[x - env.BUILD_AREA.start.x, z - env.BUILD_AREA.start.z])
 
-        while self.get_block_at(*current_coord).is_one_of(('air', 'leaves', 'log', 'vine', 'bamboo')):
-            yield current_coord
-            current_coord = current_coord.shift(0, -1, 0)
+        for current_y in range(y, lowest_y - 1, -1):
+            yield x, current_y, z
 
     def build_foundation(self, build_area: Plot) -> None:
         """Build the foundations under the house"""
@@ -167,14 +282,22 @@ class Plot:
             blocks = ('stone_bricks', 'diorite', 'cobblestone')
             weights = (75, 15, 10)
 
-            for coord in self.__iterate_over_air(self.start.y):
-                block = random.choices(blocks, weights)
-                INTF.placeBlock(*coord, block)
+            # One entry per air block between the ground and the bottom of the house, column after column
+            ground = self.get_heightmap(Criteria.MOTION_BLOCKING_NO_TREES) - 1
+            depths = np.clip(self.start.y - ground, 0, None).ravel()
+            columns = np.repeat(np.arange(depths.size), depths)
+            ys = ground.ravel()[columns] + np.arange(columns.size) - np.repeat(depths.cumsum() - depths, depths)
+            xs, zs = np.unravel_index(columns, ground.shape)
+
+            for x, y, z, block in zip((xs + self.start.x).tolist(), ys.tolist(), (zs + self.start.z).tolist(),
+                                      random.choices(blocks, weights, k=columns.size)):
+                INTF.placeBlock(x, y, z, block)
         else:
 
             # INSIDE
-            for coord in self.surface():
-                INTF.placeBlock(*coord, "oak_planks")
+            for x in range(self.start.x, self.end.x):
+                for z in range(self.start.z, self.end.z):
+                    INTF.placeBlock(x, self.start.y, z, "oak_planks")
 
             # OUTER FRAME
             for coord in self.start.shift(x=-3, z=-1).line(self.size.x + 4, Direction.EAST):
@@ -206,23 +329,18 @@ class Plot:
 
         INTF.sendBlocks()
 
-    def __iterate_over_air(self, max_y: int) -> Coordinates:
-        """"""
-        for block in self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES):
-            for new_y in range(block.coordinates.y, max_y):
-                yield block.coordinates.with_points(y=new_y)
-
     def __contains__(self, coordinates: Coordinates) -> bool:
         """Return true if the current plot contains the given coordinates"""
-        return self.start.x <= coordinates.x < self.end.x and \
-            self.start.y <= coordinates.y <= self.end.y and \
-            self.start.z <= coordinates.z < self.end.z
+        start_x, start_y, start_z, end_x, end_y, end_z = self.__bounds
+        x, y, z = coordinates.x, coordinates.y, coordinates.z
+        return start_x <= x < end_x and start_y <= y <= end_y and start_z <= z < end_z
 
     def surface(self, padding: int = 0) -> Generator[Coordinates]:
         """Return a generator over the coordinates of the current plot"""
-        for x in range(-padding, self.size.x + padding):
-            for z in range(-padding, self.size.z + padding):
-                yield self.start.shift(x, 0, z)
+        start_x, y, start_z = self.start
+        xs = range(start_x - padding, start_x + self.size.x + padding)
+        zs = range(start_z - padding, start_z + self.size.z + padding)
+        return (Coordinates(x, y, z) for x, z in product(xs, zs))
 
     def random_coord_3d(self):
         start_x, start_y, start_z = self.start
@@ -238,6 +356,7 @@ class LogicPlot(Plot):
 
         # BUILDING PLACEMENT LOGIC
         self.occupied_coordinates: set[Coordinates] = set()
+        self.occupied_grid = np.zeros((self.size.x, self.size.z), dtype=bool)
         self.construction_coordinates: set[Coordinates] = set()
         # TODO change center into coordinates
         self.center = self.start.x + self.size.x // 2, self.start.z + self.size.z // 2
@@ -256,47 +375,35 @@ class LogicPlot(Plot):
         self.__recently_added_roads = None
         self.roads_y = None
 
-    @staticmethod
-    def _delta_sum(values: list, base: int) -> int:
-        return sum(abs(base - v) for v in values)
-
-    def flat_heightmap_to_plot_block(self, index: int) -> Block | None:
-        surface = self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES)
-
-        span = self.steep_factor
-
-        side_length = self.size.x - 2 * span
-        x = index // side_length
-        z = index - side_length * x
-
-        return surface.find(self.start.shift(x + span, 0, z + span))
+    def occupy(self, coordinates: Coordinates) -> None:
+        """Mark the column of the given 2D [coordinates] as occupied, in both the set of occupied
+        coordinates and the occupied grid of the plot"""
+        self.occupied_coordinates.add(coordinates)
+        x, z = coordinates.x - self.start.x, coordinates.z - self.start.z
+        if 0 <= x < self.size.x and 0 <= z < self.size.z:
+            self.occupied_grid[x, z] = True
 
     def compute_steep_map(self):
         span = self.steep_factor
 
         heightmap: np.ndarray = self.get_heightmap(Criteria.MOTION_BLOCKING_NO_TREES)
         water_value = 100_000_000 if not self.water_mode else 10
-        steep = np.empty(shape=(self.size.x - 2 * span, self.size.z - 2 * span))
-        for i in range(span, self.size.x - span):
-            for j in range(span, self.size.z - span):
-                block = self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES).find(self.start.shift(i, 0, j))
-                if block.is_one_of(('water',)):
-                    steep[i - span, j - span] = water_value
-                else:
-                    steep[i - span, j - span] = self._delta_sum(
-                        heightmap[i - span: i + 1 + span, j - span: j + 1 + span].flatten(), heightmap[i, j])
 
-        self.steep_map = steep.flatten()
+        surface = self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES)
+        water = surface.mask('water').reshape(heightmap.shape)
+
+        steep = _steep_kernel(heightmap, span, water, water_value)
+        self.steep_map = steep
 
         amount_of_prio = int((10 / 100) * self.steep_map.size)
 
-        prio = np.argpartition(self.steep_map, amount_of_prio)[:amount_of_prio]
-        blocks = []
-        for p in prio:
-            block = self.flat_heightmap_to_plot_block(p)
-            if block and block not in self.occupied_coordinates:
-                blocks.append(block)
-        self.priority_blocks = BlockList(blocks)
+        prio = np.argpartition(self.steep_map, amount_of_prio, axis=None)[:amount_of_prio]
+
+        # Position of the chosen steep map cells in the plot, the surface being ordered the same way
+        x, z = np.unravel_index(prio, self.steep_map.shape)
+        x, z = x + span, z + span
+        indices = np.ravel_multi_index((x, z), heightmap.shape)[~self.occupied_grid[x, z]]
+        self.priority_blocks = BlockList(surface[i] for i in indices.tolist())
 
     def fill_graph(self):
         start = time.time()
@@ -304,17 +411,28 @@ class LogicPlot(Plot):
         if self.steep_map is None:
             self.compute_steep_map()
 
-        for block in self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES):
-            self.graph.add_node(block.coordinates)
+        nodes = [block.coordinates for block in self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES)]
+        self.graph.add_nodes_from(nodes)
 
-        for coordinates in self.graph.nodes.keys():
-            for coord in coordinates.neighbours():
-                if coord in self.graph.nodes.keys():
-                    # self.graph.add_edge(coordinates, coord, weight=100 + abs(coord.y - coordinates.y) * 10)
-                    malus = self.get_steep_map_value(coord)
-                    if malus > 15:
-                        malus = min(malus * 100, 100_000)
-                    self.graph.add_edge(coordinates, coord, weight=100 + malus * 10)
+        # Weight of the edges leaving each column, from the closest steep map value (see get_steep_map_value)
+        heightmap = self.get_heightmap(Criteria.MOTION_BLOCKING_NO_TREES)
+        span = self.steep_factor
+        rows = np.clip(np.arange(heightmap.shape[0]) - span, 0, self.steep_map.shape[0] - 1)
+        columns = np.clip(np.arange(heightmap.shape[1]) - span, 0, self.steep_map.shape[1] - 1)
+        malus = self.steep_map[np.ix_(rows, columns)]
+        malus = np.where(malus > 15, np.minimum(malus * 100, 100_000), malus)
+        weights = 100 + malus * 10
+
+        # Neighbouring columns are linked when their heights are at most one block apart. An edge
+        # takes the weight of the column coming first in the surface order
+        indices = np.arange(heightmap.size).reshape(heightmap.shape)
+        edges = []
+        for first, second in ((np.s_[:-1, :], np.s_[1:, :]), (np.s_[:, :-1], np.s_[:, 1:])):
+            linked = np.abs(heightmap[first] - heightmap[second]) <= 1
+            edges.extend(zip(indices[first][linked].tolist(), indices[second][linked].tolist(),
+                             weights[first][linked].tolist()))
+
+        self.graph.add_weighted_edges_from((nodes[u], nodes[v], weight) for u, v, weight in edges)
 
         if env.SHOW_TIME:
             time_took = time.time() - start
@@ -324,15 +442,15 @@ class LogicPlot(Plot):
         if self.steep_map is None:
             self.compute_steep_map()
 
-        steep_map_size = self.size.x - self.steep_factor * 2, self.size.z - self.steep_factor * 2
-        i, j = (coord - self.start).xz
-        i = min(max(i - self.steep_factor, 0), steep_map_size[0] - 1)
-        j = min(max(j - self.steep_factor, 0), steep_map_size[1] - 1)
-        return self.steep_map[j + i * steep_map_size[1]]
+        span = self.steep_factor
+        i = min(max(coord.x - self.start.x - span, 0), self.steep_map.shape[0] - 1)
+        j = min(max(coord.z - self.start.z - span, 0), self.steep_map.shape[1] - 1)
+        return self.steep_map[i, j]
 
     def visualize_occupied_area(self):
+        surface = self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES)
         for coord in self.occupied_coordinates:
-            block = self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES).find(coord)
+            block = surface.find(coord)
             if block:
                 INTF.placeBlock(*(block.coordinates.shift(y=1)), 'red_stained_glass')
         INTF.sendBlocks()
@@ -340,20 +458,34 @@ class LogicPlot(Plot):
     def visualize_steep_map(self):
         span = self.steep_factor
         colors = ('lime', 'white', 'pink', 'yellow', 'orange', 'red', 'magenta', 'purple', 'black')
-        for i, value in enumerate(self.steep_map):
-            block = self.flat_heightmap_to_plot_block(i)
-            if block:
-                INTF.placeBlock(*block.coordinates, colors[min(int(value // span), 8)] + '_stained_glass')
+        glasses = np.array([color + '_stained_glass' for color in colors], dtype=object)
+
+        # Every steep map cell lies on the surface block of its column, all the colors are picked at once
+        heightmap = self.get_heightmap(Criteria.MOTION_BLOCKING_NO_TREES)
+        xs, zs = np.indices(self.steep_map.shape)
+        ys = heightmap[span:heightmap.shape[0] - span, span:heightmap.shape[1] - span] - 1
+        names = glasses[np.minimum(self.steep_map // span, 8).astype(int)]
+
+        for x, y, z, name in zip((xs + self.start.x + span).ravel().tolist(), ys.ravel().tolist(),
+                                 (zs + self.start.z + span).ravel().tolist(), names.ravel().tolist()):
+            INTF.placeBlock(x, y, z, name)
         INTF.sendBlocks()
 
     def visualize_graph(self):
         colors = ('lime', 'white', 'pink', 'yellow', 'orange', 'red', 'magenta', 'purple', 'black')
+
+        # Lightest edge of every node
+        min_weights = {}
+        for u, v, weight in self.graph.edges(data='weight'):
+            for node in (u, v):
+                if weight < min_weights.get(node, math.inf):
+                    min_weights[node] = weight
+
         for coord in self.graph.nodes():
-            weights = list(map(lambda edge: self.graph[edge[0]][edge[1]]['weight'], self.graph.edges(coord)))
-            if len(weights) == 0:
+            coord_access_value = min_weights.get(coord)
+            if coord_access_value is None:
                 chose_color = 'blue'
             else:
-                coord_access_value = min(weights)
                 chose_color = 'black'
                 if coord_access_value < 50:
                     chose_color = colors[0]
@@ -385,12 +517,17 @@ class BuildPlacementPlot(LogicPlot):
 
         # TODO add .lower_than(max_height=200)
 
-        surface = self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES)
+        ground = self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES)
 
-        excluded = ('water', 'lava')
-        if self.water_mode:
-            excluded = ('lava',)
-        surface = BlockList(surface.get_valid_build_block_list(excluded, self.occupied_coordinates))
+        water, lava = ground.masks('water', 'lava')
+        excluded = lava if self.water_mode else water | lava
+        buildable = ~(excluded | self.occupied_grid.ravel())
+        surface = BlockList(compress(ground, buildable))
+
+        # Plot-sized grids read by __get_terrain_scores for each batch of candidates
+        heights = self.get_heightmap(Criteria.MOTION_BLOCKING_NO_TREES) - 1
+        buildable = buildable.reshape(heights.shape)
+        water = water.reshape(heights.shape)
 
         batch_amount = 5
         batch_size = 100
@@ -412,10 +549,29 @@ class BuildPlacementPlot(LogicPlot):
             # generate new batch
         # >Get the minimal score in the coordinate list
 
+            # The terrain part of the score of all the candidates is computed at once
+            terrain_scores = self.__get_terrain_scores(blocks_to_check, heights, buildable, water, size, shift)
+
+            # Without the bonuses of mines and towers, the distance malus plus the terrain score is a
+            # lower bound of the score: the candidates are checked from the lowest bound, and once it
+            # reaches the best score, no remaining candidate can do better
+            lower_bounds = None
+            order = range(len(blocks_to_check))
+            if building.properties.type is not BuildingType.MINING and building.name != 'Tower':
+                positions = blocks_to_check.positions
+                distances = np.abs(positions[:, 0] - self.center[0]) + np.abs(positions[:, 2] - self.center[1])
+                lower_bounds = (distances * .1 + terrain_scores).tolist()
+                order = np.argsort(lower_bounds, kind='stable').tolist()
+
             amount_of_block_checked = 0
-            for block in blocks_to_check:
-                block_score = self.__get_score(coordinates=block.coordinates, surface=surface, max_score=max_score,
-                                               best_current_score=min_score, building=building, size=size, shift=shift,
+            for index in order:
+                if lower_bounds is not None and lower_bounds[index] >= min_score:
+                    break
+
+                block = blocks_to_check[index]
+                block_score = self.__get_score(coordinates=block.coordinates, terrain_score=terrain_scores[index],
+                                               max_score=max_score, best_current_score=min_score,
+                                               building=building, size=size, shift=shift,
                                                city_buildings=city_buildings)
 
                 if block_score < min_score:
@@ -442,9 +598,9 @@ class BuildPlacementPlot(LogicPlot):
         coord = best_coordinates - shift
         if env.DEBUG:
             print(f"shift {shift}")
-            print(best_coordinates in map(lambda b: b.coordinates, self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES)))
+            print(best_coordinates in map(lambda b: b.coordinates, ground))
             print(best_coordinates)
-            print(coord in map(lambda b: b.coordinates, self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES)))
+            print(coord in map(lambda b: b.coordinates, ground))
 
         if building.properties.type is BuildingType.FARM:
             padding = 8
@@ -454,9 +610,9 @@ class BuildPlacementPlot(LogicPlot):
 
         for coordinates in sub_plot.surface(padding):
 
-            self.occupied_coordinates.add(coordinates.as_2D())
+            self.occupy(coordinates.as_2D())
 
-            block = self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES).find(coordinates)
+            block = ground.find(coordinates)
             if block and block.coordinates.as_2D() not in self.all_roads:
                 for edges in self.graph.edges(block.coordinates):
                     self.graph.add_edge(*edges, weight=100_000_000)
@@ -474,7 +630,36 @@ class BuildPlacementPlot(LogicPlot):
 
         return sub_plot
 
-    def __get_score(self, coordinates: Coordinates, surface: BlockList, max_score: int,
+    def __get_terrain_scores(self, blocks: BlockList, heights: ndarray, buildable: ndarray, water: ndarray,
+                             size: Size, shift: Coordinates) -> ndarray:
+        """Return the sum of the differences in the y coordinate between each of the given [blocks]
+        and the terrain under the building placed on it, infinite where it cannot be placed"""
+        scores = np.full(len(blocks), np.inf)
+        if not blocks or size.x > heights.shape[0] or size.z > heights.shape[1]:
+            return scores
+
+        xs, ys, zs = blocks.positions.T
+        xs, zs = xs - shift.x - self.start.x, zs - shift.z - self.start.z
+        inside = (xs >= 0) & (zs >= 0) & (xs + size.x <= heights.shape[0]) & (zs + size.z <= heights.shape[1])
+        xs, ys, zs = xs[inside], ys[inside], zs[inside]
+
+        # Footprints of the building on each candidate, as (candidates, size.x, size.z) arrays
+        window = (size.x, size.z)
+        footprints = np.s_[xs, zs]
+
+        # putting foundation isn't a problem compared to digging in the terrain, so we apply a
+        # worsening factor to digging
+        to_add = ys[:, None, None] - sliding_window_view(heights, window)[footprints]
+        # placing foundation where positive, digging (bad) where negative
+        terrain = np.where(to_add > 0, (to_add * .8).astype(int), -to_add * 3).sum(axis=(1, 2))
+        # little malus to push it to generate on land
+        terrain = terrain + sliding_window_view(water, window)[footprints].sum(axis=(1, 2)) * .5
+
+        valid = sliding_window_view(buildable, window)[footprints].all(axis=(1, 2))
+        scores[inside] = np.where(valid, terrain, np.inf)
+        return scores
+
+    def __get_score(self, coordinates: Coordinates, terrain_score: float, max_score: int,
                     best_current_score: int, building, size: Size, shift: Coordinates,
                     city_buildings: list = None) -> float:
         """Return a score evaluating the fitness of a building in an area.
@@ -485,7 +670,8 @@ class BuildPlacementPlot(LogicPlot):
             Sum of all differences in the y coordinate
             """
 
-        if coordinates in self.occupied_coordinates:
+        x, z = coordinates.x - self.start.x, coordinates.z - self.start.z
+        if 0 <= x < self.size.x and 0 <= z < self.size.z and self.occupied_grid[x, z]:
             return 100_000_000
 
         # apply malus to score depending on the distance to the 'center'
@@ -514,31 +700,13 @@ class BuildPlacementPlot(LogicPlot):
             score -= (100 - coordinates.y) * 2
 
         # Score = sum of difference between the first point's altitude and the other
-        for x in range(size.x):
-            for z in range(size.z):
-                current_coord = coordinates.shift(x - shift.x, 0 - shift.y, z - shift.z)
-                current_block = surface.find(current_coord)
-
-                if not current_block or current_block.coordinates in self.occupied_coordinates:
-                    return 100_000_000
-
-                if current_block.is_one_of('water'):
-                    # little malus to push it to generate on land
-                    score += .5
-
-                # putting foundation isn't a problem compared to digging in the terrain, so we apply a
-                # worsening factor to digging
-                to_add = coordinates.y - current_block.coordinates.y
-                # placing foundation
-                if to_add > 0:
-                    score += int(to_add * .8)
-                # digging (bad)
-                else:
-                    score += abs(to_add) * 3
+        if math.isinf(terrain_score):
+            return 100_000_000
+        score += terrain_score
 
-                # Return earlier if score is already too bad
-                if score >= best_current_score:
-                    return max_score
+        # Return earlier if score is already too bad
+        if score >= best_current_score:
+            return max_score
 
         # add malus due to bad road connectivity
         if city_buildings:
@@ -580,49 +748,73 @@ class RoadPlot(LogicPlot):
     def equalize_roads(self):
         if len(self.all_roads) < 1:
             return
-        self.roads_y = dict()
-
-        for road in self.all_roads:
-            neighbors_blocks = map(lambda coord: self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES).find(coord),
-                                   filter(self.all_roads.__contains__, road.around_2d(5, y=0)))
-
-            neighbors_y = list(map(lambda block: block.coordinates.y, filter(lambda block: block, neighbors_blocks)))
-
-            # Maybe use median if you implement marching cube like technic for placing stairs
-            # median_y = statistics.median_grouped(neighbors_y)
-            average_y = sum(neighbors_y) / max(len(neighbors_y), 1)
-
-            self.roads_y[road.as_2D()] = average_y
+        radius = 5
+
+        roads = list(self.all_roads)
+        roads_xz = np.array([(road.x, road.z) for road in roads])
+
+        # Grid covering the plot and every road (some of them stick out of the plot), with a margin
+        origin = np.minimum(roads_xz.min(axis=0), (self.start.x, self.start.z)) - radius
+        shape = np.maximum(roads_xz.max(axis=0) + 1, (self.end.x, self.end.z)) + radius - origin
+        x, z = roads_xz[:, 0] - origin[0], roads_xz[:, 1] - origin[1]
+        plot_area = np.s_[self.start.x - origin[0]:self.end.x - origin[0],
+                          self.start.z - origin[1]:self.end.z - origin[1]]
+
+        # Only the roads inside the plot have a surface block to take the y from
+        heights = np.zeros(shape, dtype=np.int64)
+        heights[plot_area] = self.get_heightmap(Criteria.MOTION_BLOCKING_NO_TREES) - 1
+        is_road = np.zeros(shape, dtype=bool)
+        is_road[x, z] = True
+        inside = np.zeros(shape, dtype=bool)
+        inside[plot_area] = True
+        is_road &= inside
+
+        # Maybe use median if you implement marching cube like technic for placing stairs
+        # median_y = statistics.median_grouped(neighbors_y)
+        neighbors_y = _box_sum(heights * is_road, radius)[x, z]
+        neighbors_count = _box_sum(is_road, radius)[x, z]
+        average_y = neighbors_y / np.maximum(neighbors_count, 1)
+
+        self.roads_y = dict(zip(roads, average_y.tolist()))
 
     def build_roads(self, floor_pattern: dict[str, dict[str, float]], slab_pattern=None):
         self.equalize_roads()
 
         roads = []
+        surface = self.get_blocks(Criteria.MOTION_BLOCKING_NO_LEAVES)
 
         # clean above roads
         for road in self.all_roads:
-            for i in range(1, 20):
-                coordinates = road.with_points(y=int(self.roads_y[road]) + i)
-
-                if coordinates in self and coordinates.as_2D() not in self.construction_coordinates:
-                    roads.append(self.get_blocks(Criteria.MOTION_BLOCKING_NO_LEAVES).find(coordinates))
-                    INTF.placeBlock(*coordinates, 'air')
+            if not (self.start.x <= road.x < self.end.x and self.start.z <= road.z < self.end.z):
+                continue
+            if road in self.construction_coordinates:
+                continue
+
+            road_y = int(self.roads_y[road])
+            heights = [y for y in range(road_y + 1, road_y + 20) if self.start.y <= y <= self.end.y]
+            if heights:
+                roads.append(surface.find(road))
+            for y in heights:
+                INTF.placeBlock(road.x, y, road.z, 'air')
 
         self.remove_trees(BlockList(roads))
 
+        floor_choices = _cumulative_pattern(floor_pattern)
+        slab_choices = _cumulative_pattern(slab_pattern) if slab_pattern else None
+
         # place blocks
         for key in self.roads_infos.keys():
             for road in self.roads_infos[key]:
                 if road not in self:
                     continue
                 # Default : place a block
-                chose_pattern = floor_pattern
+                chose_pattern = floor_choices
                 shift = 0
 
                 # If the average block y is near half :
                 if slab_pattern and 0.5 < self.roads_y[road] - int(self.roads_y[road]):
                     # place a slab
-                    chose_pattern = slab_pattern
+                    chose_pattern = slab_choices
                     shift = 1
                     if road.as_2D() in self.construction_coordinates:
                         continue
@@ -632,8 +824,8 @@ class RoadPlot(LogicPlot):
                     if not self.get_block_at(x, y, z).is_one_of(('air', 'grass', 'snow', 'sand', 'stone')):
                         continue
 
-                the_blocks = random.choices(list(chose_pattern[key].keys()),
-                                            k=1, weights=list(chose_pattern[key].values()))
+                names, cum_weights = chose_pattern[key]
+                the_blocks = random.choices(names, cum_weights=cum_weights, k=1)
 
                 if the_blocks[0] in ('minecraft:shroomlight', 'minecraft:sea_lantern',
                                      'minecraft:glowstone', 'minecraft:redstone_lamp[lit=true]'):
@@ -644,66 +836,51 @@ class RoadPlot(LogicPlot):
                         continue
 
                     if 'note_block' in the_blocks[0]:
-                        INTF.placeBlock(x, y+1, z, random.choice(list(slab_pattern['OUTER'].keys())))
+                        INTF.placeBlock(x, y+1, z, random.choice(slab_choices['OUTER'][0]))
 
                     INTF.placeBlock(x, y, z, the_blocks)
 
         INTF.sendBlocks()
 
-    def __add_road_block(self, coordinates: Coordinates, placement: str):
+    def __add_road_block(self, road_coord: Coordinates, placement: str):
+        """Add the given 2D [road_coord] to the [placement] part of the roads, unless it already
+        belongs to a more important part. It is removed from the less important parts"""
+        higher, lower = _ROAD_PRECEDENCE[placement]
 
-        road_coord = coordinates.as_2D()
+        roads_infos = self.roads_infos
+        for part in higher:
+            if road_coord in roads_infos[part]:
+                return
 
-        delete = False
-        for key in self.roads_infos:
-            if key == placement:
-                if road_coord not in self.__recently_added_roads[placement]:
-                    self.roads_infos[key][road_coord] += 1
-                delete = True
-            else:
-                if road_coord in self.roads_infos[key]:
-                    if delete:
-                        self.roads_infos[key].pop(road_coord)
-                    else:
-                        return
+        if road_coord not in self.__recently_added_roads[placement]:
+            roads_infos[placement][road_coord] += 1
+        for part in lower:
+            roads_infos[part].pop(road_coord, None)
 
         self.__recently_added_roads[placement].add(road_coord)
         self.all_roads.add(road_coord)
-        self.occupied_coordinates.add(road_coord)
+        self.occupy(road_coord)
 
     def compute_roads(self, start: Coordinates, end: Coordinates) -> bool:
         time_start = time.time()
         if self.graph is None:
             self.fill_graph()
 
-        start = b.coordinates if (b := self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES).find(start)) else start
-        end = b.coordinates if (b := self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES).find(end)) else end
+        surface = self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES)
+        start = b.coordinates if (b := surface.find(start)) else start
+        end = b.coordinates if (b := surface.find(end)) else end
 
         try:
-            path = nx.dijkstra_path(self.graph, start, end)
+            # Search from both ends at once, the explored area stays much smaller on long roads
+            _, path = nx.bidirectional_dijkstra(self.graph, start, end)
         except nx.NetworkXException:
             return False
 
-        self.__recently_added_roads = {'INNER': set(), 'MIDDLE': set(), 'OUTER': set()}
+        self.__recently_added_roads = {part: set() for part in ROAD_PARTS}
         for coord in path:
-            # INNER PART
-            self.__add_road_block(coord, 'INNER')
-
-            # MIDDLE PART
-            self.__add_road_block(coord.shift(x=1), 'MIDDLE')
-            self.__add_road_block(coord.shift(x=-1), 'MIDDLE')
-            self.__add_road_block(coord.shift(z=1), 'MIDDLE')
-            self.__add_road_block(coord.shift(z=-1), 'MIDDLE')
-
-            # OUTER PART
-            self.__add_road_block(coord.shift(x=1, z=1), 'OUTER')
-            self.__add_road_block(coord.shift(x=-1, z=1), 'OUTER')
-            self.__add_road_block(coord.shift(x=1, z=-1), 'OUTER')
-            self.__add_road_block(coord.shift(x=-1, z=-1), 'OUTER')
-            self.__add_road_block(coord.shift(x=2), 'OUTER')
-            self.__add_road_block(coord.shift(x=-2), 'OUTER')
-            self.__add_road_block(coord.shift(z=2), 'OUTER')
-            self.__add_road_block(coord.shift(z=-2), 'OUTER')
+            x, z = coord.x, coord.z
+            for placement, dx, dz in ROAD_OFFSETS:
+                self.__add_road_block(Coordinates(x + dx, 0, z + dz), placement)
 
         # Update weights to use the roads
         for c1, c2 in zip(path[:-2], path[1:]):
@@ -740,10 +917,10 @@ class RoadPlot(LogicPlot):
         colors = ('lime', 'white', 'pink', 'yellow', 'orange', 'red', 'magenta', 'purple', 'black')
         materials = ('concrete', 'wool', 'stained_glass')
         self.equalize_roads()
+        surface = self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES)
         for i, key in enumerate(self.roads_infos):
             for road in self.roads_infos[key]:
-                block = self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES).find(
-                    road)  # to be sure that we are in the plot
+                block = surface.find(road)  # to be sure that we are in the plot
                 if block:
                     INTF.placeBlock(*(road.with_points(y=self.roads_y[road] + y_offset)),
                                     colors[min(self.roads_infos[key][road], len(colors)) - 1] + '_' + materials[i])
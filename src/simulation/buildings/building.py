@@ -126,18 +126,22 @@ class Blueprint(ABC):
         valid_blocks = self.blocks[self.structures[0]].without(('air', 'water'))
         sample: list[Block] = random.sample(valid_blocks, amount * len(valid_blocks) // 100)
 
-        for block in sample:
+        materials = {
+            'cobblestone': ('mossy_cobblestone', True),
+            'mossy_stone': ('cracked_stone', True),
+            'stone': ('mossy_stone', True),
+            'planks': ('stairs', False)
+        }
+
+        # What becomes of the blocks without replacement material, drawn for all the blocks at once
+        # (None keeps the block as it is)
+        weathering = random.choices((None, 'oak_leaves', 'cobweb'), (60, 30, 10), k=len(sample))
+
+        for block, name in zip(sample, weathering):
 
             if block.is_one_of(('lectern', 'rail', 'sign')):
                 continue
 
-            materials = {
-                'cobblestone': ('mossy_cobblestone', True),
-                'mossy_stone': ('cracked_stone', True),
-                'stone': ('mossy_stone', True),
-                'planks': ('stairs', False)
-            }
-
             replacement = block.replace_first(materials)
 
             if replacement is not block and Block.exists(replacement.name):
@@ -149,16 +153,11 @@ class Blueprint(ABC):
                         {'facing': facing, 'half': half, 'shape': shape}))
 
             else:
-                population = (block.name, 'oak_leaves', 'cobweb')
-                weights = (60, 30, 10)
-
-                name = random.choices(population, weights, k=1)
-
-                if name == block.name:
+                if name is None:
                     continue
 
-                replacement = Block(name[0], block.coordinates, properties=BlockProperties({
-                    'persistent': 'true'} if name[0] == 'oak_leaves' else {}))
+                replacement = Block(name, block.coordinates, properties=BlockProperties({
+                    'persistent': 'true'} if name == 'oak_leaves' else {}))
 
             INTERFACE.placeBlock(*replacement.coordinates, replacement.full_name)
         INTERFACE.sendBlocks()
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import math
 import textwrap
-from dataclasses import astuple
 from dataclasses import dataclass
 from typing import Any
 from typing import Iterator
@@ -20,7 +19,7 @@ def R(a: float):
     return np.array(((c, -s), (s, c)))
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Size:
     """Class representing a 2 dimensional size"""
     x: int
@@ -29,8 +28,7 @@ class Size:
     @staticmethod
     def from_coordinates(start: Coordinates, end: Coordinates) -> Size:
         """Return a new size computed from the two given coordinates"""
-        distance = abs(start - end)
-        return Size(distance.x, distance.z)
+        return Size(abs(start.x - end.x), abs(start.z - end.z))
 
     def get_rotation_shift(self, rotation: int):
         shift_due_to_rotation = Coordinates(0, 0, 0)
@@ -63,7 +61,7 @@ class Size:
         return Coordinates(self.x // 2, 0, self.z // 2)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Coordinates:
     """Represents a set of x, y and z coordinates"""
     x: int